@@ -1,11 +1,86 @@
 import streamlit as st
+import aioboto3
+from aiobotocore.config import AioConfig
 import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
-import pandas as pd
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import (
+    NoCredentialsError, PartialCredentialsError, ClientError, ConnectTimeoutError, ReadTimeoutError
+)
 from datetime import datetime
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_plus
+from zipstream import ZipStream, ZIP_STORED, ZIP_DEFLATED
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import asyncio
+import functools
+import hashlib
 import io
-import zipfile
-import re
+import itertools
+import json
+import string
+import tempfile
+import time
+import re2
+
+# Concurrency settings for S3 requests
+MAX_DOWNLOAD_CONCURRENCY = 64
+INITIAL_DOWNLOAD_CONCURRENCY = 4
+CONCURRENCY_STEP = 4
+THROUGHPUT_WINDOW_SECONDS = 2.0
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_MAX_ATTEMPTS = 5
+MAX_POOL_CONNECTIONS = 64
+S3_MAX_ATTEMPTS = 10
+LISTING_MAX_WORKERS = 24
+HEAD_MAX_WORKERS = 32
+
+# Large single-file downloads are split into concurrent ranged GETs
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True
+)
+
+# ZIP compression for bulk downloads. PDFs are already compressed internally,
+# so storing them is the default; compression is opt-in for other content.
+ZIP_COMPRESSION_OPTIONS = {
+    "None (fastest)": ZIP_STORED,
+    "Deflate": ZIP_DEFLATED,
+}
+try:
+    # Zstandard support requires Python 3.14+
+    from zipstream import ZIP_ZSTANDARD
+    ZIP_COMPRESSION_OPTIONS["Zstandard"] = ZIP_ZSTANDARD
+except ImportError:
+    pass
+
+# Units for human readable file sizes
+SIZE_UNITS = ["B", "KB", "MB", "GB"]
+
+# How long a bucket listing is reused across searches (seconds)
+LISTING_CACHE_TTL = 300
+
+# Columns read from S3 Inventory files, and their names in CSV inventory schemas
+INVENTORY_COLUMNS = ['key', 'size', 'last_modified_date', 'e_tag']
+# Present when the inventory includes all object versions
+VERSION_COLUMNS = ['is_latest', 'is_delete_marker']
+CSV_INVENTORY_FIELDS = {
+    'Key': 'key', 'Size': 'size', 'LastModifiedDate': 'last_modified_date', 'ETag': 'e_tag',
+    'IsLatest': 'is_latest', 'IsDeleteMarker': 'is_delete_marker'
+}
+# Characters that URL encoding never changes
+URL_SAFE_CHARACTERS = set(string.ascii_letters + string.digits + '-_.~')
+
+# Downloaded files kept for repeat single-file downloads
+FILE_CACHE_MAX_ENTRIES = 64
+FILE_CACHE_MAX_FILE_SIZE = 8 * 1024 * 1024
+FILE_CACHE_TTL = 3600
 
 # Configure Streamlit page
 st.set_page_config(
@@ -30,60 +105,319 @@ aws_region = st.sidebar.selectbox("AWS Region", [
 # S3 Bucket configuration
 bucket_name = st.sidebar.text_input("S3 Bucket Name")
 prefix = st.sidebar.text_input("Folder Prefix (optional)", help="Leave empty to search entire bucket")
+inventory_manifest_uri = st.sidebar.text_input(
+    "Inventory manifest S3 URI (optional)",
+    placeholder="s3://inventory-bucket/path/manifest.json",
+    help="Read the file list from an S3 Inventory report (Parquet or CSV) instead of listing the bucket"
+)
+
+@st.cache_resource(show_spinner=False)
+def create_s3_client(access_key, secret_key, region):
+    """Create an S3 client, shared across reruns for the same credentials"""
+    # Size the connection pool so concurrent threads don't block each other,
+    # and let botocore back off adaptively on throttling and transient errors
+    client_config = Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'adaptive'}
+    )
+    if access_key and secret_key:
+        return boto3.client(
+            's3',
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region,
+            config=client_config
+        )
+    # Try to use default credentials (IAM role, AWS CLI config, etc.)
+    return boto3.client('s3', region_name=region, config=client_config)
 
 def get_s3_client():
-    """Create and return S3 client"""
+    """Return the S3 client for the configured credentials"""
     try:
-        if aws_access_key and aws_secret_key:
-            return boto3.client(
-                's3',
-                aws_access_key_id=aws_access_key,
-                aws_secret_access_key=aws_secret_key,
-                region_name=aws_region
-            )
-        else:
-            # Try to use default credentials (IAM role, AWS CLI config, etc.)
-            return boto3.client('s3', region_name=aws_region)
+        return create_s3_client(aws_access_key, aws_secret_key, aws_region)
     except Exception as e:
         st.error(f"Error creating S3 client: {str(e)}")
         return None
 
+def get_credentials_hash():
+    """Return a hash identifying the current AWS credentials without exposing them"""
+    credentials = f"{aws_access_key}:{aws_secret_key}:{aws_region}"
+    return hashlib.sha256(credentials.encode("utf-8")).hexdigest()
+
+def list_prefix(s3_client, bucket, prefix, delimiter=None):
+    """List objects under a prefix, plus its sub-prefixes when a delimiter is given"""
+    params = {'Bucket': bucket, 'Prefix': prefix, 'PaginationConfig': {'PageSize': 1000}}
+    if delimiter:
+        params['Delimiter'] = delimiter
+    
+    objects = []
+    sub_prefixes = []
+    for page in s3_client.get_paginator('list_objects_v2').paginate(**params):
+        objects.extend(page.get('Contents', []))
+        sub_prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+    return objects, sub_prefixes
+
+def build_file_info(key, size, last_modified, etag):
+    """Build a file record, precomputing the display and lowercase match fields"""
+    file_name = key.split('/')[-1]
+    return {
+        'Key': key,
+        'FileName': file_name,
+        'Size': size,
+        'LastModified': last_modified,
+        'ETag': etag,
+        'SizeFormatted': format_file_size(size),
+        'KeyLower': key.lower(),
+        'NameLower': file_name.lower()
+    }
+
+@st.cache_data(ttl=LISTING_CACHE_TTL, show_spinner=False)
+def list_all_pdfs(_s3_client, bucket, prefix, creds_hash):
+    """List all PDF files under the prefix, cached per bucket, prefix and credentials"""
+    # Discover top-level folders first so each one can be listed in parallel
+    objects, sub_prefixes = list_prefix(_s3_client, bucket, prefix, delimiter='/')
+    if len(sub_prefixes) < 2:
+        for sub_prefix in sub_prefixes:
+            objects.extend(list_prefix(_s3_client, bucket, sub_prefix)[0])
+    else:
+        with ThreadPoolExecutor(max_workers=min(LISTING_MAX_WORKERS, len(sub_prefixes))) as executor:
+            results = executor.map(lambda p: list_prefix(_s3_client, bucket, p), sub_prefixes)
+            for sub_objects, _ in results:
+                objects.extend(sub_objects)
+    
+    all_s3_files = []
+    for obj in objects:
+        if obj['Key'].lower().endswith('.pdf'):
+            all_s3_files.append(build_file_info(obj['Key'], obj['Size'], obj['LastModified'], obj['ETag']))
+    return all_s3_files
+
+def parse_s3_uri(uri):
+    """Split an s3://bucket/key URI into (bucket, key)"""
+    if not uri.startswith('s3://'):
+        raise ValueError(f"Not an S3 URI: {uri}")
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+def read_inventory_csv(source, column_names, include_columns):
+    """Parse inventory CSV rows into a table with the include_columns fields"""
+    return pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(column_names=column_names),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=include_columns,
+            column_types={
+                'key': pa.string(),
+                'size': pa.int64(),
+                'last_modified_date': pa.timestamp('ms', tz='UTC'),
+                'e_tag': pa.string(),
+                'is_latest': pa.bool_(),
+                'is_delete_marker': pa.bool_()
+            },
+            # Delete markers have no size or ETag
+            strings_can_be_null=True
+        )
+    )
+
+def inventory_read_columns(column_names):
+    """Return the inventory fields to read: INVENTORY_COLUMNS plus any VERSION_COLUMNS"""
+    return INVENTORY_COLUMNS + [c for c in VERSION_COLUMNS if c in column_names]
+
+def inventory_column_names(manifest):
+    """Return an inventory report's column names, checking it has every INVENTORY_COLUMNS field"""
+    file_format = manifest['fileFormat']
+    file_schema = manifest.get('fileSchema', '')
+    if file_format == 'CSV':
+        # e.g. "Bucket, Key, Size, LastModifiedDate, ETag"
+        column_names = [CSV_INVENTORY_FIELDS.get(name.strip(), name.strip()) for name in file_schema.split(',')]
+    elif file_format == 'Parquet':
+        # e.g. "message s3.inventory { required binary key (STRING); optional int64 size; ... }"
+        column_names = re2.findall(r'(?:required|optional|repeated)\s+\w+\s+(\w+)', file_schema)
+    else:
+        raise ValueError(f"Unsupported inventory format: {file_format}")
+    
+    # Size, last modified date and ETag are optional inventory fields
+    missing_columns = [c for c in INVENTORY_COLUMNS if c not in column_names]
+    if missing_columns:
+        raise ValueError(
+            f"Inventory report is missing fields: {', '.join(missing_columns)}. "
+            "Enable Size, Last modified and ETag in the inventory configuration."
+        )
+    return column_names
+
+def read_inventory_file(s3_client, bucket, key, file_format, column_names):
+    """Read one S3 Inventory data file into a table with the fields from inventory_read_columns"""
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+    read_columns = inventory_read_columns(column_names)
+    if file_format == 'Parquet':
+        return pq.read_table(io.BytesIO(body), columns=read_columns)
+    return read_inventory_csv(pa.input_stream(pa.py_buffer(body), compression='gzip'), column_names, read_columns)
+
+def load_inventory_manifest(s3_client, manifest_uri, bucket):
+    """Load an S3 Inventory manifest, checking that it describes the given bucket"""
+    manifest_bucket, manifest_key = parse_s3_uri(manifest_uri)
+    manifest = json.loads(s3_client.get_object(Bucket=manifest_bucket, Key=manifest_key)['Body'].read())
+    if manifest['sourceBucket'] != bucket:
+        raise ValueError(f"Inventory manifest is for bucket {manifest['sourceBucket']}, not {bucket}")
+    # Inventory data files live in the destination bucket named in the manifest
+    manifest['inventoryBucket'] = manifest['destinationBucket'].split(':::')[-1]
+    return manifest
+
+def inventory_table_to_files(table, prefix, url_encoded):
+    """Build file records for the PDF rows of an inventory table under the prefix"""
+    # Inventories cover every object, so drop non-PDFs in one vectorized pass
+    keep = pc.ends_with(pc.utf8_lower(table['key']), '.pdf')
+    # Inventories that include all versions also list noncurrent versions and
+    # delete markers; only the current version of each object can be downloaded
+    if 'is_latest' in table.column_names:
+        keep = pc.and_(keep, pc.fill_null(table['is_latest'], True))
+    if 'is_delete_marker' in table.column_names:
+        keep = pc.and_(keep, pc.invert(pc.fill_null(table['is_delete_marker'], False)))
+    # Skip rows without a size or ETag rather than building incomplete records
+    keep = pc.and_(keep, pc.and_(pc.is_valid(table['size']), pc.is_valid(table['e_tag'])))
+    table = table.filter(keep)
+    files = []
+    for key, size, last_modified, etag in zip(*(table[c].to_pylist() for c in INVENTORY_COLUMNS)):
+        # CSV inventories URL-encode object keys
+        if url_encoded:
+            key = unquote_plus(key)
+        if key.startswith(prefix):
+            files.append(build_file_info(key, size, last_modified, f'"{etag}"'))
+    return files
+
+@st.cache_data(ttl=LISTING_CACHE_TTL, show_spinner=False)
+def list_inventory_pdfs(_s3_client, manifest_uri, bucket, prefix, creds_hash):
+    """List PDF files from an S3 Inventory report instead of paginating the bucket"""
+    manifest = load_inventory_manifest(_s3_client, manifest_uri, bucket)
+    column_names = inventory_column_names(manifest)
+    all_s3_files = []
+    for inventory_file in manifest['files']:
+        table = read_inventory_file(
+            _s3_client,
+            manifest['inventoryBucket'],
+            inventory_file['key'],
+            manifest['fileFormat'],
+            column_names
+        )
+        all_s3_files.extend(inventory_table_to_files(table, prefix, manifest['fileFormat'] == 'CSV'))
+    return all_s3_files
+
+def can_select_inventory(search_text):
+    """Return True if search_text can be matched server-side against a CSV inventory"""
+    # Keys are URL-encoded in CSV inventories, so only text that encoding leaves
+    # unchanged can be pushed down. Without a text filter, the cached inventory
+    # catalog is cheaper than re-scanning every inventory file.
+    return bool(search_text) and set(search_text) <= URL_SAFE_CHARACTERS
+
+@st.cache_data(ttl=LISTING_CACHE_TTL, show_spinner=False)
+def select_inventory_pdfs(_s3_client, manifest_uri, bucket, prefix, search_text, creds_hash):
+    """Filter a CSV inventory report with S3 Select so only candidate rows are downloaded
+
+    Returns a superset of the PDFs whose key contains search_text, or None when
+    the inventory isn't CSV.
+    """
+    manifest = load_inventory_manifest(_s3_client, manifest_uri, bucket)
+    if manifest['fileFormat'] != 'CSV':
+        return None
+    
+    column_names = inventory_column_names(manifest)
+    columns = {name: f"s._{i + 1}" for i, name in enumerate(column_names)}
+    
+    # search_text is URL-safe (see can_select_inventory), so it matches the
+    # encoded keys as-is; the caller does the exact match on the decoded names
+    key_column = f"LOWER({columns['key']})"
+    like_text = search_text.lower().replace('_', '!_')
+    conditions = [f"{key_column} LIKE '%.pdf'", f"{key_column} LIKE '%{like_text}%' ESCAPE '!'"]
+    # Leave out noncurrent versions and delete markers of versioned inventories
+    if 'is_latest' in columns:
+        conditions.append(f"{columns['is_latest']} <> 'false'")
+    if 'is_delete_marker' in columns:
+        conditions.append(f"{columns['is_delete_marker']} <> 'true'")
+    expression = (
+        f"SELECT {', '.join(columns[c] for c in INVENTORY_COLUMNS)} FROM s3object s "
+        f"WHERE {' AND '.join(conditions)}"
+    )
+    
+    def select_file(inventory_file):
+        response = _s3_client.select_object_content(
+            Bucket=manifest['inventoryBucket'],
+            Key=inventory_file['key'],
+            ExpressionType='SQL',
+            Expression=expression,
+            InputSerialization={'CSV': {'FileHeaderInfo': 'NONE'}, 'CompressionType': 'GZIP'},
+            OutputSerialization={'CSV': {}}
+        )
+        return b''.join(event['Records']['Payload'] for event in response['Payload'] if 'Records' in event)
+    
+    all_s3_files = []
+    with ThreadPoolExecutor(max_workers=LISTING_MAX_WORKERS) as executor:
+        for rows in executor.map(select_file, manifest['files']):
+            if rows:
+                table = read_inventory_csv(io.BytesIO(rows), INVENTORY_COLUMNS, INVENTORY_COLUMNS)
+                all_s3_files.extend(inventory_table_to_files(table, prefix, url_encoded=True))
+    return all_s3_files
+
+def get_pdf_catalog(s3_client, bucket, prefix):
+    """Return all PDF files under the prefix, from the inventory report if one is configured"""
+    if inventory_manifest_uri:
+        return list_inventory_pdfs(s3_client, inventory_manifest_uri, bucket, prefix, get_credentials_hash())
+    return list_all_pdfs(s3_client, bucket, prefix, get_credentials_hash())
+
+def head_pdfs(s3_client, bucket, target_files, prefix=""):
+    """Look up exact filenames directly under the prefix with HEAD requests, returning (found, missing)"""
+    def head(target_file):
+        key = f"{prefix}{target_file}"
+        try:
+            response = s3_client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            # Without s3:ListBucket a missing key is reported as 403 rather than 404
+            if e.response.get('Error', {}).get('Code') in ('404', '403', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return build_file_info(key, response['ContentLength'], response['LastModified'], response['ETag'])
+    
+    found_files = []
+    missing_files = []
+    with ThreadPoolExecutor(max_workers=HEAD_MAX_WORKERS) as executor:
+        for target_file, file_info in zip(target_files, executor.map(head, target_files)):
+            if file_info:
+                found_files.append(file_info)
+            else:
+                missing_files.append(target_file)
+    return found_files, missing_files
+
 def find_specific_pdfs(s3_client, bucket, target_files, prefix=""):
     """Find specific PDF files in the S3 bucket"""
     try:
-        paginator = s3_client.get_paginator('list_objects_v2')
-        pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
-        
         found_files = []
         all_s3_files = []
+        target_files = [name.strip() for name in target_files if name.strip()]
         
-        # Get all PDF files in bucket
-        for page in pages:
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    if obj['Key'].lower().endswith('.pdf'):
-                        all_s3_files.append({
-                            'Key': obj['Key'],
-                            'FileName': obj['Key'].split('/')[-1],
-                            'Size': obj['Size'],
-                            'LastModified': obj['LastModified'],
-                            'SizeFormatted': format_file_size(obj['Size'])
-                        })
+        # With a known prefix, exact filenames can be checked directly, skipping
+        # the bucket listing. This only finds files at the root of the prefix:
+        # same-named files in its subfolders are not returned for names found here.
+        if prefix and target_files and all(name.lower().endswith('.pdf') for name in target_files):
+            found_files, target_files = head_pdfs(s3_client, bucket, target_files, prefix)
         
-        # Match target files with S3 files
+        if target_files:
+            all_s3_files = get_pdf_catalog(s3_client, bucket, prefix)
+        
+        # Index filenames once so exact matches are a dict lookup
+        exact_by_name = {}
+        for f in all_s3_files:
+            exact_by_name.setdefault(f['NameLower'], []).append(f)
+        
+        # Match remaining target files with S3 files
         for target_file in target_files:
-            target_file = target_file.strip()
-            if not target_file:
-                continue
-                
+            target_lower = target_file.lower()
+            
             # Try exact filename match first
-            exact_matches = [f for f in all_s3_files if f['FileName'].lower() == target_file.lower()]
+            exact_matches = exact_by_name.get(target_lower)
             
             if exact_matches:
                 found_files.extend(exact_matches)
             else:
                 # Try partial match
-                partial_matches = [f for f in all_s3_files if target_file.lower() in f['FileName'].lower()]
+                partial_matches = [f for f in all_s3_files if target_lower in f['NameLower']]
                 if partial_matches:
                     found_files.extend(partial_matches)
         
@@ -96,67 +430,294 @@ def find_specific_pdfs(s3_client, bucket, target_files, prefix=""):
         st.error(f"Unexpected error: {str(e)}")
         return [], []
 
-def search_by_pattern(s3_client, bucket, pattern, prefix=""):
-    """Search PDF files using regex pattern"""
+@functools.lru_cache(maxsize=128)
+def compile_pattern(pattern):
+    """Compile a case-insensitive regex with RE2, which matches in linear time"""
+    # Memoized because Streamlit reruns the script, and the search, on every interaction
+    options = re2.Options()
+    options.case_sensitive = False
+    options.log_errors = False
+    return re2.compile(pattern, options)
+
+def search_by_pattern(s3_client, bucket, pattern, prefix="", match_type="regex"):
+    """Search PDF filenames using a regex pattern, or a plain "contains", "startswith" or "endswith" text"""
     try:
-        paginator = s3_client.get_paginator('list_objects_v2')
-        pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
-        
-        found_files = []
-        pattern_regex = re.compile(pattern, re.IGNORECASE)
-        
-        for page in pages:
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    if obj['Key'].lower().endswith('.pdf'):
-                        if pattern_regex.search(obj['Key']) or pattern_regex.search(obj['Key'].split('/')[-1]):
-                            found_files.append({
-                                'Key': obj['Key'],
-                                'FileName': obj['Key'].split('/')[-1],
-                                'Size': obj['Size'],
-                                'LastModified': obj['LastModified'],
-                                'SizeFormatted': format_file_size(obj['Size'])
-                            })
+        search_text = pattern.lower()
+        if match_type == "contains":
+            matches = lambda f: search_text in f['NameLower']
+        elif match_type == "startswith":
+            matches = lambda f: f['NameLower'].startswith(search_text)
+        elif match_type == "endswith":
+            # The text is what comes before the .pdf extension
+            search_text += ".pdf"
+            matches = lambda f: f['NameLower'].endswith(search_text)
+        else:
+            pattern_regex = compile_pattern(pattern)
+            matches = lambda f: pattern_regex.search(f['FileName'])
+        all_s3_files = None
+        use_select = (
+            inventory_manifest_uri
+            and match_type != "regex"
+            and can_select_inventory(pattern)
+            and not st.session_state.get('s3_select_unavailable', False)
+        )
+        if use_select:
+            # Let S3 Select filter the inventory server-side; regexes can't be expressed in its SQL
+            try:
+                all_s3_files = select_inventory_pdfs(
+                    s3_client, inventory_manifest_uri, bucket, prefix, pattern, get_credentials_hash()
+                )
+            except ClientError:
+                # S3 Select isn't available to every account; don't retry it this session
+                st.session_state.s3_select_unavailable = True
+                all_s3_files = None
+        if all_s3_files is None:
+            all_s3_files = get_pdf_catalog(s3_client, bucket, prefix)
         
+        found_files = [f for f in all_s3_files if matches(f)]
         return found_files
         
-    except re.error as e:
-        st.error(f"Invalid regex pattern: {e}")
+    except re2.error as e:
+        message = e.args[0].decode() if e.args and isinstance(e.args[0], bytes) else str(e)
+        st.error(f"Invalid regex pattern: {message}")
         return []
     except Exception as e:
         st.error(f"Error searching files: {str(e)}")
         return []
 
+@functools.lru_cache(maxsize=1024)
 def format_file_size(size_bytes):
     """Convert bytes to human readable format"""
     if size_bytes == 0:
         return "0B"
-    size_names = ["B", "KB", "MB", "GB"]
-    i = 0
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
-    return f"{size_bytes:.1f} {size_names[i]}"
-
-def download_file(s3_client, bucket, key):
+    # Each unit is 2**10 times the previous one, so the bit length picks the unit
+    i = min((int(size_bytes).bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (10 * i)):.1f} {SIZE_UNITS[i]}"
+
+def fetch_file(s3_client, bucket, key):
+    """Download a file's bytes, using concurrent ranged GETs for large files"""
+    buffer = io.BytesIO()
+    s3_client.download_fileobj(bucket, key, buffer, Config=TRANSFER_CONFIG)
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=FILE_CACHE_MAX_ENTRIES, ttl=FILE_CACHE_TTL, show_spinner=False)
+def download_file_cached(_s3_client, bucket, key, etag, creds_hash):
+    """Download a file's bytes, cached per bucket, key, ETag and credentials"""
+    return fetch_file(_s3_client, bucket, key)
+
+def download_file(s3_client, bucket, key, etag, size):
     """Download a file from S3"""
     try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        return response['Body'].read()
+        # The cache is shared by every session on the server, so only small files
+        # are kept, bounding it to FILE_CACHE_MAX_ENTRIES * FILE_CACHE_MAX_FILE_SIZE
+        if size > FILE_CACHE_MAX_FILE_SIZE:
+            return fetch_file(s3_client, bucket, key)
+        # The ETag from the listing changes whenever the object does, so cached
+        # bytes are never stale
+        return download_file_cached(s3_client, bucket, key, etag, get_credentials_hash())
     except Exception as e:
         st.error(f"Error downloading {key}: {str(e)}")
         return None
 
-def create_zip_file(files_data):
-    """Create a ZIP file containing multiple PDFs"""
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for file_name, file_data in files_data.items():
-            # Use just the filename without the full path for cleaner zip structure
-            clean_name = file_name.split('/')[-1]
-            zip_file.writestr(clean_name, file_data)
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
+class AdaptiveConcurrencyLimiter:
+    """Limit concurrent downloads, tuning the limit to measured throughput
+
+    The limit grows additively while throughput keeps improving and is halved
+    when throughput drops or S3 times out or throttles (AIMD).
+    """
+    
+    def __init__(self, initial=INITIAL_DOWNLOAD_CONCURRENCY, maximum=MAX_DOWNLOAD_CONCURRENCY):
+        self.limit = initial
+        self.maximum = maximum
+        self.in_use = 0
+        self._condition = asyncio.Condition()
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._last_rate = None
+    
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_use < self.limit)
+            self.in_use += 1
+    
+    async def release(self):
+        async with self._condition:
+            self.in_use -= 1
+            self._condition.notify()
+    
+    async def record(self, num_bytes):
+        """Count downloaded bytes, adjusting the limit at the end of each window"""
+        self._window_bytes += num_bytes
+        elapsed = time.monotonic() - self._window_start
+        if elapsed < THROUGHPUT_WINDOW_SECONDS:
+            return
+        rate = self._window_bytes / elapsed
+        if self._last_rate is None or rate > self._last_rate * 1.1:
+            await self._set_limit(self.limit + CONCURRENCY_STEP)
+        elif rate < self._last_rate * 0.9:
+            await self._set_limit(self.limit // 2)
+        self._last_rate = rate
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+    
+    async def back_off(self):
+        """Halve the limit after a timeout or throttling response"""
+        await self._set_limit(self.limit // 2)
+    
+    async def _set_limit(self, limit):
+        async with self._condition:
+            self.limit = max(1, min(limit, self.maximum))
+            self._condition.notify_all()
+
+def is_congestion_error(error):
+    """Return True for errors that suggest too many concurrent requests"""
+    if isinstance(error, (ConnectTimeoutError, ReadTimeoutError)):
+        return True
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in ('SlowDown', '503', 'RequestTimeout')
+    return False
+
+async def fetch_object_async(s3, limiter, bucket, file_info):
+    """Fetch an object with aioboto3, returning (file_info, data or streaming body, error)"""
+    # The slot is released by the consumer once the result has been handed off
+    await limiter.acquire()
+    # Larger objects aren't requested until the consumer streams them, so no
+    # response sits idle (and times out) while earlier files are being zipped
+    if file_info['Size'] > STREAM_CHUNK_SIZE:
+        return file_info, iter_object_chunks_async(s3, limiter, bucket, file_info), None
+    try:
+        response = await s3.get_object(Bucket=bucket, Key=file_info['Key'])
+        async with response['Body'] as stream:
+            data = await stream.read()
+        await limiter.record(len(data))
+        return file_info, data, None
+    except Exception as e:
+        if is_congestion_error(e):
+            await limiter.back_off()
+        return file_info, None, e
+
+async def iter_object_chunks_async(s3, limiter, bucket, file_info):
+    """Stream an object in chunks, resuming with a ranged GET if the connection drops"""
+    received = 0
+    attempt = 1
+    while True:
+        params = {'Bucket': bucket, 'Key': file_info['Key']}
+        if received:
+            # Continue from the last byte written, and only from the same object version
+            params['Range'] = f"bytes={received}-"
+            params['IfMatch'] = file_info['ETag']
+        try:
+            response = await s3.get_object(**params)
+            async with response['Body'] as stream:
+                async for chunk in stream.iter_chunks(STREAM_CHUNK_SIZE):
+                    received += len(chunk)
+                    await limiter.record(len(chunk))
+                    yield chunk
+            return
+        except Exception as e:
+            if is_congestion_error(e):
+                await limiter.back_off()
+            if isinstance(e, ClientError) or attempt >= STREAM_MAX_ATTEMPTS:
+                if not received:
+                    raise
+                # Part of the file is already in the archive, so it can't be skipped
+                raise IOError(f"Download of {file_info['Key']} failed part-way: {str(e)}") from e
+            await asyncio.sleep(2 ** attempt * 0.1)
+            attempt += 1
+
+async def iter_downloads_async(bucket, files, limiter):
+    """Download files on one event loop, yielding (file_info, data, error) as each completes"""
+    session = aioboto3.Session(
+        aws_access_key_id=aws_access_key or None,
+        aws_secret_access_key=aws_secret_key or None,
+        region_name=aws_region
+    )
+    client_config = AioConfig(
+        max_pool_connections=limiter.maximum,
+        retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'adaptive'}
+    )
+    async with session.client('s3', config=client_config) as s3:
+        # The limiter bounds downloads in flight plus results not yet consumed,
+        # so memory doesn't grow with the selection
+        tasks = [asyncio.ensure_future(fetch_object_async(s3, limiter, bucket, f)) for f in files]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+                await limiter.release()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+def iter_async(loop, async_iterator):
+    """Iterate an async generator from synchronous code by stepping it on loop"""
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(async_iterator.aclose())
+
+def iter_downloads(bucket, files):
+    """Download files concurrently, yielding (file_info, data, error) as each completes
+
+    data is either the file's bytes or, for large files, an iterator of chunks
+    that downloads the file as it is consumed.
+    """
+    # Drive the async downloader from this thread so callers can report progress
+    # and errors with regular Streamlit calls between results
+    loop = asyncio.new_event_loop()
+    try:
+        limiter = AdaptiveConcurrencyLimiter()
+        downloads = iter_downloads_async(bucket, files, limiter)
+        for file_info, data, error in iter_async(loop, downloads):
+            if data is not None and not isinstance(data, bytes):
+                chunks = iter_async(loop, data)
+                # Fetch the first chunk now, so a file that can't be downloaded at all
+                # is reported and skipped like a small one
+                try:
+                    first_chunk = next(chunks, b'')
+                except Exception as e:
+                    data, error = None, e
+                else:
+                    data = itertools.chain([first_chunk], chunks)
+            yield file_info, data, error
+    finally:
+        loop.close()
+
+def unique_archive_name(name, used_names):
+    """Return name, or "name (n).ext" if it's already taken, and record it as used"""
+    stem, dot, extension = name.rpartition('.')
+    if not dot:
+        stem, extension = name, ''
+    candidate = name
+    n = 2
+    # Compare case-insensitively so entries don't collide on case-insensitive filesystems
+    while candidate.lower() in used_names:
+        candidate = f"{stem} ({n}){dot}{extension}"
+        n += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+def write_zip_file(files_data, fileobj, compress_type=ZIP_STORED):
+    """Stream (file_name, bytes or chunk iterator) pairs into a ZIP archive written to fileobj"""
+    zip_stream = ZipStream(compress_type=compress_type)
+    file_count = 0
+    used_names = set()
+    for file_name, file_data in files_data:
+        # Use just the filename without the full path for cleaner zip structure,
+        # numbering repeats since the same name can exist in several folders
+        clean_name = unique_archive_name(file_name.split('/')[-1], used_names)
+        zip_stream.add(file_data, clean_name)
+        # Flush each entry as soon as it's added so downloaded data isn't retained
+        # and large files pass through one chunk at a time
+        for chunk in zip_stream.all_files():
+            fileobj.write(chunk)
+        file_count += 1
+    for chunk in zip_stream.footer():
+        fileobj.write(chunk)
+    return file_count
 
 # Main application
 st.header("Specify PDFs to Extract")
@@ -198,27 +759,39 @@ elif extraction_method == "Pattern Search":
     st.subheader("🔍 Search by Pattern")
     
     pattern_type = st.selectbox("Pattern type:", ["Contains text", "Starts with", "Ends with", "Regex"])
+    # Simple pattern types use plain string matching; only "Regex" needs the regex engine
+    match_type = "regex"
     
     if pattern_type == "Contains text":
         search_text = st.text_input("Enter text that filename should contain:", placeholder="report")
-        pattern = f".*{re.escape(search_text)}.*" if search_text else ""
+        pattern = search_text
+        match_type = "contains"
     elif pattern_type == "Starts with":
         start_text = st.text_input("Enter text that filename should start with:", placeholder="invoice_")
-        pattern = f"^{re.escape(start_text)}.*" if start_text else ""
+        pattern = start_text
+        match_type = "startswith"
     elif pattern_type == "Ends with":
         end_text = st.text_input("Enter text that filename should end with (before .pdf):", placeholder="_final")
-        pattern = f".*{re.escape(end_text)}\.pdf$" if end_text else ""
+        pattern = end_text
+        match_type = "endswith"
     else:  # Regex
         pattern = st.text_input(
             "Enter regex pattern:",
             placeholder="report_\\d{4}.*\\.pdf",
-            help="Use regular expressions for complex matching"
+            help="Use regular expressions (RE2 syntax, no backreferences or lookarounds) for complex matching"
         )
     
     # Show pattern preview
     if pattern:
         st.code(f"Pattern: {pattern}")
 
+# Bucket listings are cached, so let users pick up newly uploaded files
+if st.sidebar.button("🔄 Refresh listing", help=f"Listings are reused for {LISTING_CACHE_TTL // 60} minutes; refresh to see newly uploaded files"):
+    list_all_pdfs.clear()
+    list_inventory_pdfs.clear()
+    select_inventory_pdfs.clear()
+    st.sidebar.success("Listing cache cleared")
+
 # Connection and search
 if bucket_name and (extraction_method == "Browse All PDFs" or 
                    (extraction_method == "Specific Filenames" and target_files) or 
@@ -237,7 +810,7 @@ if bucket_name and (extraction_method == "Browse All PDFs" or
                         st.success(f"Found {len(found_files)} matching PDFs out of {len(target_files)} requested")
                         
                         # Show which files were found and which weren't
-                        found_names = {f['FileName'].lower() for f in found_files}
+                        found_names = {f['NameLower'] for f in found_files}
                         target_names_lower = {name.lower() for name in target_files}
                         missing_files = target_names_lower - found_names
                         
@@ -259,7 +832,7 @@ if bucket_name and (extraction_method == "Browse All PDFs" or
                                 st.write(f"... and {len(all_files) - 10} more files")
                 
                 elif extraction_method == "Pattern Search":
-                    found_files = search_by_pattern(s3_client, bucket_name, pattern, prefix)
+                    found_files = search_by_pattern(s3_client, bucket_name, pattern, prefix, match_type)
                     
                     st.subheader("Search Results")
                     if found_files:
@@ -269,73 +842,89 @@ if bucket_name and (extraction_method == "Browse All PDFs" or
                         st.error("No PDFs found matching the pattern")
                 
                 else:  # Browse All PDFs
-                    # Reuse the pattern search with match-all pattern
-                    found_files = search_by_pattern(s3_client, bucket_name, ".*", prefix)
+                    # Reuse the pattern search; every filename contains the empty string
+                    found_files = search_by_pattern(s3_client, bucket_name, "", prefix, "contains")
                     st.success(f"Found {len(found_files)} PDFs in bucket")
                     st.session_state.found_files = found_files
                 
                 st.session_state.s3_client = s3_client
                 st.session_state.bucket_name = bucket_name
+                # New results start a fresh, unselected table so old row positions
+                # never point into a different result set
+                st.session_state.select_all = False
+                st.session_state.selection_version = st.session_state.get('selection_version', 0) + 1
 
 # Display found files and download options
 if 'found_files' in st.session_state and st.session_state.found_files:
     st.header("📄 Found PDFs")
     
-    # Create DataFrame for display
-    df = pd.DataFrame(st.session_state.found_files)
-    
     # Sort options
     sort_by = st.selectbox("Sort by:", ["Name", "Size", "Last Modified"])
-    if sort_by == "Name":
-        df = df.sort_values('FileName')
-    elif sort_by == "Size":
-        df = df.sort_values('Size', ascending=False)
-    else:
-        df = df.sort_values('LastModified', ascending=False)
+    sort_key = {'Name': 'FileName', 'Size': 'Size', 'Last Modified': 'LastModified'}[sort_by]
+    records = sorted(st.session_state.found_files, key=itemgetter(sort_key), reverse=(sort_by != "Name"))
     
     # File selection
     st.subheader("Select files to download:")
     
-    # Quick selection buttons
+    # Quick selection buttons. Each click (like each search) starts a fresh table
+    # widget so its default selection replaces whatever rows were picked by hand.
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("✅ Select All"):
             st.session_state.select_all = True
+            st.session_state.selection_version = st.session_state.get('selection_version', 0) + 1
     with col2:
         if st.button("❌ Select None"):
             st.session_state.select_all = False
+            st.session_state.selection_version = st.session_state.get('selection_version', 0) + 1
     with col3:
-        st.metric("Total Files", len(df))
+        st.metric("Total Files", len(records))
     
-    # Individual file selection
-    selected_files = []
-    for idx, row in df.iterrows():
-        default_value = getattr(st.session_state, 'select_all', False)
-        col1, col2, col3 = st.columns([1, 3, 1])
-        
-        with col1:
-            selected = st.checkbox("", key=f"select_{idx}", value=default_value)
-        
-        with col2:
-            st.write(f"📄 **{row['FileName']}**")
-            st.caption(f"Path: {row['Key']} | Size: {row['SizeFormatted']} | Modified: {row['LastModified'].strftime('%Y-%m-%d %H:%M')}")
-        
-        with col3:
-            # Individual download button
-            if st.button("⬇️", key=f"download_{idx}", help="Download this file"):
-                with st.spinner(f"Downloading {row['FileName']}..."):
-                    file_data = download_file(st.session_state.s3_client, st.session_state.bucket_name, row['Key'])
-                    if file_data:
-                        st.download_button(
-                            label=f"💾 Save {row['FileName']}",
-                            data=file_data,
-                            file_name=row['FileName'],
-                            mime="application/pdf",
-                            key=f"save_{idx}"
-                        )
-        
-        if selected:
-            selected_files.append(row)
+    # File selection via the table's native row selection (a single widget)
+    select_all = getattr(st.session_state, 'select_all', False)
+    event = st.dataframe(
+        records,
+        column_order=['FileName', 'Key', 'SizeFormatted', 'LastModified'],
+        column_config={
+            'FileName': "📄 File",
+            'Key': "Path",
+            'SizeFormatted': "Size",
+            'LastModified': st.column_config.DatetimeColumn("Modified", format="YYYY-MM-DD HH:mm"),
+        },
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        selection_default={'selection': {'rows': list(range(len(records))) if select_all else []}},
+        # Selections are row positions, so re-sorting also starts a fresh table
+        key=f"found_files_table_{sort_by}_{st.session_state.get('selection_version', 0)}",
+    )
+    # Ignore stored positions that don't exist in the current results
+    selected_files = [records[i] for i in event.selection.rows if i < len(records)]
+    
+    # Individual download
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        # Select by key rather than row position so re-sorting keeps the same file
+        records_by_key = {r['Key']: r for r in records}
+        file_key = st.selectbox("Download a single file:", list(records_by_key), key="single_file_key")
+    with col2:
+        if st.button("⬇️ Download", help="Download this file"):
+            row = records_by_key[file_key]
+            with st.spinner(f"Downloading {row['FileName']}..."):
+                file_data = download_file(
+                    st.session_state.s3_client,
+                    st.session_state.bucket_name,
+                    row['Key'],
+                    row['ETag'],
+                    row['Size']
+                )
+                if file_data:
+                    st.download_button(
+                        label=f"💾 Save {row['FileName']}",
+                        data=file_data,
+                        file_name=row['FileName'],
+                        mime="application/pdf"
+                    )
     
     # Bulk download options
     if selected_files:
@@ -349,31 +938,46 @@ if 'found_files' in st.session_state and st.session_state.found_files:
             st.metric("Total Size", format_file_size(total_size))
         
         with col2:
+            compression = st.selectbox(
+                "ZIP compression:",
+                list(ZIP_COMPRESSION_OPTIONS),
+                help="PDFs are already compressed, so extra compression mostly costs time"
+            )
             if st.button("📦 Download Selected as ZIP", type="primary"):
                 with st.spinner("Creating ZIP file..."):
-                    files_data = {}
                     progress_bar = st.progress(0)
                     
-                    for i, file_info in enumerate(selected_files):
-                        file_data = download_file(
-                            st.session_state.s3_client,
-                            st.session_state.bucket_name,
-                            file_info['Key']
-                        )
-                        if file_data:
-                            files_data[file_info['FileName']] = file_data
-                        
-                        progress_bar.progress((i + 1) / len(selected_files))
+                    def downloaded_files():
+                        # Streamlit calls stay on this thread, so errors are reported here
+                        downloads = iter_downloads(st.session_state.bucket_name, selected_files)
+                        for i, (file_info, file_data, error) in enumerate(downloads):
+                            if error is not None:
+                                st.error(f"Error downloading {file_info['Key']}: {str(error)}")
+                            elif file_data:
+                                yield file_info['FileName'], file_data
+                            progress_bar.progress((i + 1) / len(selected_files))
                     
-                    if files_data:
-                        zip_data = create_zip_file(files_data)
-                        st.download_button(
-                            label="💾 Download ZIP File",
-                            data=zip_data,
-                            file_name=f"extracted_pdfs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                            mime="application/zip"
-                        )
-                        st.success(f"✅ ZIP file ready with {len(files_data)} PDFs!")
+                    # Build the archive on disk rather than holding every PDF in memory
+                    with tempfile.TemporaryFile() as zip_file:
+                        try:
+                            file_count = write_zip_file(
+                                downloaded_files(),
+                                zip_file,
+                                ZIP_COMPRESSION_OPTIONS[compression]
+                            )
+                        except Exception as e:
+                            # A failure part-way through streaming a file leaves the archive unusable
+                            st.error(f"Error creating ZIP file: {str(e)}")
+                            file_count = 0
+                        if file_count:
+                            zip_file.seek(0)
+                            st.download_button(
+                                label="💾 Download ZIP File",
+                                data=zip_file.read(),
+                                file_name=f"extracted_pdfs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                                mime="application/zip"
+                            )
+                            st.success(f"✅ ZIP file ready with {file_count} PDFs!")
 
 # Instructions
 with st.expander("📖 How to Use"):
@@ -381,9 +985,9 @@ with st.expander("📖 How to Use"):
     ### Step-by-step Instructions:
     
     1. **Configure AWS**: Enter your AWS credentials in the sidebar
-    2. **Set Bucket**: Specify your S3 bucket name and optional folder prefix
+    2. **Set Bucket**: Specify your S3 bucket name and optional folder prefix (for very large buckets, optionally an S3 Inventory manifest URI)
     3. **Choose Method**:
-       - **Specific Filenames**: Enter exact PDF names you want to extract
+       - **Specific Filenames**: Enter exact PDF names you want to extract (with a folder prefix set, names found directly in that folder are not also searched for in its subfolders)
        - **Pattern Search**: Use patterns to find PDFs (e.g., all reports from 2024)
        - **Browse All PDFs**: See all PDFs in the bucket
     4. **Search**: Click "Search for PDFs" to find matching files